@@ -30,7 +30,7 @@ setup(
     version='0.0.0.' + datetime.datetime.now().strftime('%Y%m%d%H%M%S'),
     author='Luis López',
     author_email='luis@cuarentaydos.com',
-    packages=['usend'],
+    packages=['usend', 'usend.transports'],
     scripts=[],
     url='https://github.com/ldotlopez/usend',
     license='LICENSE.txt',
@@ -41,7 +41,7 @@ setup(
     install_requires=open('requirements.txt').read().split('\n'),
     entry_points={
        'console_scripts': [
-            'usend=usend:main'
+            'usend=usend.cli:main'
         ]
     }
 )
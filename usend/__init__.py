@@ -1,5 +1,6 @@
 import importlib
 import re
+import sys
 
 
 class Parameter:
@@ -84,6 +85,10 @@ class SendError(Exception):
     pass
 
 
+class AmbiguousSendError(SendError):
+    pass
+
+
 def split_params(transport_cls, **params):
     init_params = {}
     send_params = {}
@@ -116,17 +121,127 @@ def get_transport(name):
     return cls
 
 
-def send(transport, **params):
-    if isinstance(transport, type) and \
+def get_ledger_scope(**transport_params):
+    """
+    Short digest of transport params, identifies a transport configuration
+    (ex. a telegram bot) in ledger keys
+    """
+    import hashlib
+    import json
+
+    data = json.dumps(transport_params, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+
+def get_ledger_key(transport_cls, idempotency_key, destination=None,
+                   scope=None):
+    """
+    Serialized as a JSON list so separators in destination, scope or key
+    can't make two different keys collide
+    """
+    import json
+
+    return json.dumps(
+        [transport_cls.name(), scope, destination, idempotency_key],
+        default=str)
+
+
+def record_in_ledger(ledger, key, result, status):
+    try:
+        ledger.record(key, result, status=status)
+    except (OSError, TypeError, ValueError) as e:
+        errmsg = "Can't record '{key}' in ledger: {e}"
+        errmsg = errmsg.format(key=key, e=e)
+        print(errmsg, file=sys.stderr)
+
+
+def send(transport, idempotency_key=None, ledger=None, scope=None,
+         **params):
+    """
+    Send using transport (a name, a Transport subclass or a Transport
+    instance).
+
+    If idempotency_key is given the outcome is recorded in ledger (a
+    usend.ledger.Ledger, the default one is used if not provided) for the
+    key, transport, scope and destination:
+
+    - The entry is marked pending before sending. If the send doesn't
+      finish (timeout, connection error, process killed) it stays pending
+      and further calls raise AmbiguousSendError since the message may have
+      been delivered.
+    - Successful sends are recorded with the transport result (provider
+      message id), further calls return it without sending anything.
+    - Sends refused by the transport or provider (SendError, ParameterError,
+      ValueError, TypeError) are recorded as failed and further calls try
+      again.
+
+    scope identifies the transport configuration, it defaults to a digest of
+    transport params. Pass it explicitly when sending with a Transport
+    instance configured differently from others.
+    """
+    if isinstance(transport, Transport):
+        transport_cls = type(transport)
+    elif isinstance(transport, type) and \
             issubclass(transport, Transport) and \
             type(transport) != Transport:
         transport_cls = transport
     elif isinstance(transport, str):
         transport_cls = get_transport(transport)
     else:
-        err = "transport must be a str or a Trasport subclass"
+        err = "transport must be a str or a Trasport subclass or instance"
         raise TypeError(err)
 
-    transport_params, send_params = split_params(transport_cls, **params)
-    transport = transport_cls(**transport_params)
-    return transport.send(**send_params)
+    if isinstance(transport, Transport):
+        transport_params, send_params = None, params
+    else:
+        transport_params, send_params = split_params(transport_cls, **params)
+
+    if idempotency_key is None:
+        if transport_params is not None:
+            transport = transport_cls(**transport_params)
+
+        return transport.send(**send_params)
+
+    from usend import ledger as _ledger
+
+    if ledger is None:
+        ledger = _ledger.get_default_ledger()
+
+    if scope is None and transport_params is not None:
+        scope = get_ledger_scope(**transport_params)
+
+    key = get_ledger_key(transport_cls, idempotency_key,
+                         send_params.get('destination'), scope=scope)
+
+    # Hold the key lock while sending so concurrent sends with the same key
+    # (threads or processes) don't both miss and send
+    with ledger.lock(key):
+        try:
+            status, result = ledger.get(key)
+        except KeyError:
+            status, result = None, None
+
+        if status == _ledger.SENT:
+            return result
+
+        if status == _ledger.PENDING:
+            errmsg = ("a previous send with key '{key}' didn't finish, it may "
+                      "have been delivered. Use a new idempotency key to "
+                      "send anyway")
+            errmsg = errmsg.format(key=idempotency_key)
+            raise AmbiguousSendError(errmsg)
+
+        if transport_params is not None:
+            transport = transport_cls(**transport_params)
+
+        record_in_ledger(ledger, key, None, _ledger.PENDING)
+
+        try:
+            ret = transport.send(**send_params)
+        except (SendError, ParameterError, TypeError, ValueError) as e:
+            record_in_ledger(ledger, key, str(e), _ledger.FAILED)
+            raise
+
+        record_in_ledger(ledger, key, ret, _ledger.SENT)
+
+    return ret
@@ -0,0 +1,281 @@
+import argparse
+import concurrent.futures
+import math
+import os
+import sys
+import threading
+import time
+
+
+import usend
+from usend import cli
+
+
+def get_argument_parser():
+    parser = argparse.ArgumentParser(prog='usend bench', add_help=False)
+    basic = parser.add_argument_group('Basic arguments')
+    basic.add_argument(
+        '-h', '--help',
+        action='store_true')
+    basic.add_argument(
+        '-c', '--config',
+        default=[],
+        action='append',
+        required=False)
+
+    mode_group = basic.add_mutually_exclusive_group()
+    mode_group.add_argument(
+        '--transport',
+        default='null',
+        required=False)
+    mode_group.add_argument(
+        '--profile',
+        required=False)
+
+    bench = parser.add_argument_group('Benchmark arguments')
+    bench.add_argument(
+        '--rate',
+        type=float,
+        default=100.0,
+        help='Target sends per second')
+    bench.add_argument(
+        '--duration',
+        type=float,
+        default=10.0,
+        help='Duration in seconds')
+    bench.add_argument(
+        '-j', '--jobs',
+        type=cli.positive_int,
+        default=1,
+        help='Concurrent sends, issued in bursts through the CLI dispatcher')
+    bench.add_argument(
+        '--ledger',
+        required=False,
+        help='Use an idempotency key for each send, recorded in this ledger')
+
+    return parser
+
+
+class Histogram(object):
+    """
+    Log-bucketed histogram of latencies in ms, buckets are 1% wide so memory
+    doesn't grow with the number of samples
+    """
+    MIN = 0.001
+    RESOLUTION = 1.01
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        if value <= self.MIN:
+            idx = 0
+        else:
+            idx = math.ceil(math.log(value / self.MIN, self.RESOLUTION))
+
+        with self._lock:
+            self.buckets[idx] = self.buckets.get(idx, 0) + 1
+            self.count += 1
+            self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """
+        Nearest-rank percentile, upper bound of its bucket
+        """
+        if not self.count:
+            return 0.0
+
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self.MIN * self.RESOLUTION ** idx, self.max)
+
+        return self.max
+
+
+def get_rss():
+    """
+    Current resident set size in KiB, None if not available (only on linux)
+    """
+    try:
+        with open('/proc/self/statm', 'r') as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def run(transport, name, send_params, rate, duration, jobs=1, ledger=None):
+    """
+    Send at target rate during duration through the CLI dispatcher, in
+    bursts of jobs sends.
+
+    Latency is measured from the time each burst was scheduled, so time
+    waiting for a late dispatcher is accounted. Service time is measured
+    from the actual start of each send.
+
+    With jobs > 1 a single thread pool is reused for the whole run.
+
+    Returns latency and service time histograms, the number of failed sends
+    and the elapsed time, at least the scheduled window so the time until
+    the next (not sent) burst is accounted.
+    """
+    send_params = dict(send_params)
+    destination = send_params.pop('destination', None)
+
+    n = int(rate * duration)
+    batch = max(1, jobs)
+    interval = batch / rate
+    key_prefix = 'bench-{}-'.format(os.getpid())
+
+    latency = Histogram()
+    service = Histogram()
+
+    def get_sender(scheduled):
+        def sender(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return cli.send_one(*args, **kwargs)
+            finally:
+                t1 = time.perf_counter()
+                latency.add((t1 - scheduled) * 1000)
+                service.add((t1 - t0) * 1000)
+
+        return sender
+
+    executor = None
+    if jobs > 1:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+
+    failed = 0
+    start = time.perf_counter()
+
+    for (b, first) in enumerate(range(0, n, batch)):
+        scheduled = start + b * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        batch_jobs = []
+        for i in range(first, min(first + batch, n)):
+            params = dict(send_params)
+            if ledger is not None:
+                params['idempotency_key'] = key_prefix + str(i)
+                params['ledger'] = ledger
+            batch_jobs.append((name, name, transport, destination, params))
+
+        results = cli.dispatch(batch_jobs, max_workers=jobs,
+                               sender=get_sender(scheduled),
+                               executor=executor)
+        failed += len([e for (_, e) in results if e is not None])
+
+    elapsed = time.perf_counter() - start
+    if executor is not None:
+        executor.shutdown()
+
+    return latency, service, failed, max(elapsed, n / rate)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = get_argument_parser()
+    args, _ = parser.parse_known_args(argv)
+
+    if not args.config:
+        args.config = [
+            os.path.expanduser('~/.config/usend.ini'),
+            os.path.expanduser('~/.usend.ini')
+        ]
+
+    params = {}
+    transport = args.transport
+    if args.profile:
+        config = cli.load_config_files(*args.config)
+        try:
+            params.update(config[args.profile])
+        except KeyError:
+            errmsg = "Profile '{name}' not found"
+            errmsg = errmsg.format(name=args.profile)
+            print(errmsg, file=sys.stderr)
+            return 1
+
+        transport = params.pop('transport', None)
+        if not transport:
+            errmsg = "Profile '{name}' doesn't define a transport"
+            errmsg = errmsg.format(name=args.profile)
+            print(errmsg, file=sys.stderr)
+            return 1
+
+    cli.configure_argparser_for_transports(parser, [transport],
+                                           defaults=not args.profile)
+    args = parser.parse_args(argv)
+    if args.help:
+        parser.print_help()
+        return 0
+
+    if args.rate <= 0 or args.duration <= 0:
+        print("Error: rate and duration must be positive", file=sys.stderr)
+        return 1
+
+    if args.rate * args.duration < 1:
+        print("Error: rate * duration must be at least 1", file=sys.stderr)
+        return 1
+
+    cmdline_params = {
+        k: v
+        for (k, v) in vars(args).items()
+        if k not in cli.BASIC_ARGUMENTS + ('rate', 'duration') and v
+    }
+    destinations = cmdline_params.pop('destination', None)
+
+    _, caps, _ = cli.get_transport_argspec(transport)
+    if caps & usend.Capability.RECIEVER:
+        params['destination'] = (
+            destinations[0] if destinations
+            else params.get('destination', 'bench'))
+    if caps & usend.Capability.MESSAGE:
+        cmdline_params.setdefault('message', 'bench')
+
+    try:
+        instance, _, send_params = cli.build_transport(
+            transport, params, cmdline_params)
+    except (TypeError, ValueError, usend.ParameterError) as e:
+        cli.print_error(transport, transport, e)
+        return 1
+
+    ledger = None
+    if args.ledger:
+        from usend import ledger as _ledger
+        ledger = _ledger.Ledger(args.ledger)
+
+    rss0 = get_rss()
+    latency, service, failed, elapsed = run(
+        instance, transport, send_params, args.rate, args.duration,
+        jobs=args.jobs, ledger=ledger)
+    rss1 = get_rss()
+
+    print("sent: {ok} ok, {failed} failed in {elapsed:.2f}s".format(
+        ok=latency.count - failed, failed=failed, elapsed=elapsed))
+    print("throughput: {achieved:.1f}/s (target {target:.1f}/s)".format(
+        achieved=latency.count / elapsed, target=args.rate))
+    for (label, hist) in (('latency', latency), ('service', service)):
+        print("{label}: p50={p50:.3f}ms p90={p90:.3f}ms p99={p99:.3f}ms "
+              "max={max:.3f}ms".format(
+                  label=label,
+                  p50=hist.percentile(50),
+                  p90=hist.percentile(90),
+                  p99=hist.percentile(99),
+                  max=hist.max))
+    if rss0 is not None:
+        print("memory: RSS {rss1} KiB ({growth:+d} KiB)".format(
+            rss1=rss1, growth=rss1 - rss0))
+
+    return 0
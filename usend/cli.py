@@ -0,0 +1,432 @@
+import argparse
+import configparser
+import functools
+import os
+import re
+import sys
+
+
+import usend
+
+
+BASIC_ARGUMENTS = (
+    'help', 'config', 'profile', 'transport', 'jobs', 'idempotency_key',
+    'ledger'
+)
+SEND_ARGUMENTS = ('message', 'details', 'attachments')
+
+
+def load_profile(config, profile_name):
+    """
+    FIXME: generalize and move to core module
+    """
+    ret = {}
+    if not config.has_section(profile_name):
+        raise KeyError(profile_name)
+
+    for (name, value) in config.items(profile_name):
+        ret[name] = value
+
+    try:
+        includes = re.split(r"[\s,]+", ret.pop('!include'))
+    except KeyError:
+        return ret
+
+    for x in includes:
+        ret.update(load_profile(config, x))
+
+    return ret
+
+
+def load_config_files(*config_filepaths):
+    config = configparser.ConfigParser()
+
+    for filepath in config_filepaths:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as fh:
+                config.read_file(fh)
+            break
+
+        except OSError as e:
+            errmsg = "Can't read config file '{filepath}': {msg}"
+            errmsg = errmsg.format(filepath=filepath, msg=str(e))
+            print(errmsg, file=sys.stderr)
+
+    return {
+        sect: {
+            k.replace('-', '_'): v
+            for (k, v)
+            in config[sect].items()
+        }
+        for sect
+        in config
+        if sect != 'DEFAULT'
+    }
+
+
+def positive_int(value):
+    ret = int(value)
+    if ret < 1:
+        errmsg = "invalid positive int value: '{value}'"
+        raise argparse.ArgumentTypeError(errmsg.format(value=value))
+
+    return ret
+
+
+def get_basic_argument_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    basic = parser.add_argument_group('Basic arguments')
+    basic.add_argument(
+        '-h', '--help',
+        action='store_true')
+    basic.add_argument(
+        '-c', '--config',
+        default=[],
+        action='append',
+        required=False)
+
+    mode_group = basic.add_mutually_exclusive_group(required=True)
+    mode_group.add_argument(
+        '--transport',
+        required=False)
+    mode_group.add_argument(
+        '--profile',
+        default=[],
+        action='append',
+        required=False)
+
+    basic.add_argument(
+        '-j', '--jobs',
+        type=positive_int,
+        default=4,
+        required=False)
+    basic.add_argument(
+        '--idempotency-key',
+        required=False)
+    basic.add_argument(
+        '--ledger',
+        required=False)
+
+    return parser
+
+
+def get_full_argument_parser(transports, defaults=True):
+    parser = get_basic_argument_parser()
+    configure_argparser_for_transports(parser, transports, defaults=defaults)
+
+    return parser
+
+
+@functools.lru_cache(maxsize=None)
+def get_transport_argspec(transport):
+    """
+    Command line specification for transport derived from its PARAMETERS and
+    CAPS.
+
+    Returns a (name, caps, params) tuple, params is a tuple of
+    (option, parameter) pairs.
+    """
+    cls = usend.get_transport(transport)
+    params = tuple(
+        ('--' + cls.name() + '-' + param.name.replace('_', '-'), param)
+        for param in cls.PARAMETERS
+    )
+
+    return cls.name(), cls.CAPS, params
+
+
+def is_fully_specified(transport, params, argv):
+    """
+    Check if profile params provide all required parameters for transport and
+    there are no transport arguments (or abbreviations of them) in argv.
+    """
+    name, _, spec = get_transport_argspec(transport)
+
+    # argparse accepts any unambiguous prefix of an option (ex. --telegram
+    # for --telegram-token)
+    for x in argv:
+        opt = x.split('=', 1)[0]
+        if len(opt) > 2 and opt.startswith('--') and \
+                any(option.startswith(opt) for (option, _) in spec):
+            return False
+
+    return all(
+        name + '_' + param.name in params
+        for (_, param) in spec
+        if param.required
+    )
+
+
+def configure_argparser_for_transports(parser, transports, defaults=True):
+    """
+    Add transport and send arguments for all transports.
+
+    If defaults is False transport parameters are neither required nor
+    defaulted, they are expected to come from a profile.
+    """
+    caps = usend.Capability.NONE
+
+    transport_group = parser.add_argument_group('Transport arguments')
+    for transport in transports:
+        _, transport_caps, spec = get_transport_argspec(transport)
+        caps |= transport_caps
+
+        for (option, param) in spec:
+            kwargs = {
+                'required': param.required and defaults,
+                'type': param.type
+            }
+            if not param.required and defaults:
+                kwargs['default'] = param.default
+            transport_group.add_argument(option, **kwargs)
+
+    configure_argparser_for_send(parser, caps)
+
+
+def configure_argparser_for_send(parser, caps):
+    send_group = parser.add_argument_group('Send arguments')
+    if caps & usend.Capability.RECIEVER:
+        send_group.add_argument(
+            '-t', '--to',
+            dest='destination',
+            default=[],
+            action='append'
+        )
+
+    if caps & usend.Capability.MESSAGE:
+        send_group.add_argument(
+            '--message',
+            dest='message',
+        )
+
+    if caps & usend.Capability.DETAILS:
+        send_group.add_argument(
+            '--details',
+            dest='details',
+        )
+
+    if caps & usend.Capability.ATTACHMENTS:
+        send_group.add_argument(
+            '-a', '--attachment',
+            dest='attachments',
+            action='append'
+        )
+
+
+def build_transport(transport, params, cmdline_params):
+    """
+    Build a transport instance from profile and command line params.
+
+    Returns the instance, its init params and the params for its send
+    method.
+    """
+    cls = usend.get_transport(transport)
+
+    params = dict(params)
+    params.update({
+        k: v
+        for (k, v) in cmdline_params.items()
+        if k in SEND_ARGUMENTS or k.startswith(cls.name() + '_')
+    })
+
+    init_params, send_params = usend.split_params(cls, **params)
+    return cls(**init_params), init_params, send_params
+
+
+def send_one(transport, destination, **params):
+    if destination is not None:
+        params['destination'] = destination
+
+    return usend.send(transport, **params)
+
+
+def dispatch(jobs, max_workers=1, sender=send_one, executor=None, **extra):
+    """
+    Run (label, transport, instance, destination, params) jobs concurrently
+    using sender (send_one by default) for each one.
+
+    An existing concurrent.futures executor can be passed to reuse its
+    threads, max_workers is ignored then.
+
+    Returns a list of (job, error) tuples in the same order as jobs, error is
+    None on success.
+    """
+    # Avoid thread pool (and its imports) for the common single send
+    if executor is None and (len(jobs) <= 1 or max_workers <= 1):
+        ret = []
+        for job in jobs:
+            (_, _, instance, destination, params) = job
+            try:
+                sender(instance, destination, **params, **extra)
+            except Exception as e:
+                ret.append((job, e))
+            else:
+                ret.append((job, None))
+
+        return ret
+
+    if executor is None:
+        import concurrent.futures
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers) as executor:
+            return dispatch(jobs, sender=sender, executor=executor, **extra)
+
+    futures = [
+        executor.submit(sender, instance, destination, **params, **extra)
+        for (_, _, instance, destination, params) in jobs
+    ]
+
+    return [(job, fut.exception()) for (job, fut) in zip(jobs, futures)]
+
+
+def print_error(label, transport, e):
+    errmsg = "Error: {label}: {e}"
+    if isinstance(e, (TypeError, usend.ParameterError)):
+        errmsg += "\ntry using usend --transport {transport} --help"
+
+    errmsg = errmsg.format(label=label, e=e, transport=transport)
+    print(errmsg, file=sys.stderr)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv[:1] == ['bench']:
+        from usend import bench
+        return bench.main(argv[1:])
+
+    # Minimal parser
+    parser = get_basic_argument_parser()
+    args, _ = parser.parse_known_args(argv)
+
+    # Set some default config files if not provided from command line
+    if not args.config:
+        args.config = [
+            os.path.expanduser('~/.config/usend.ini'),
+            os.path.expanduser('~/.usend.ini')
+        ]
+
+    # Show help if not transport is specified
+    if args.help and not args.transport and not args.profile:
+        parser.print_help()
+        return 0
+
+    # Initialize targets from config file (if any). Config is loaded once
+    # for all profiles.
+    targets = []
+    if args.profile:
+        config = load_config_files(*args.config)
+        for name in args.profile:
+            try:
+                params = dict(config[name])
+            except KeyError:
+                errmsg = "Profile '{name}' not found"
+                errmsg = errmsg.format(name=name)
+                print(errmsg, file=sys.stderr)
+                return 1
+
+            transport = params.pop('transport', None)
+            if not transport:
+                errmsg = "Profile '{name}' doesn't define a transport"
+                errmsg = errmsg.format(name=name)
+                print(errmsg, file=sys.stderr)
+                return 1
+
+            targets.append((name, transport, params))
+
+    else:
+        targets.append((args.transport, args.transport, {}))
+
+    # Full parse arguments. Reuse the basic parser, if profiles provide all
+    # transport parameters only send arguments are needed.
+    transports = []
+    for (_, transport, _) in targets:
+        if transport not in transports:
+            transports.append(transport)
+
+    fast_path = (
+        args.profile and
+        not args.help and
+        all(is_fully_specified(transport, params, argv)
+            for (_, transport, params) in targets)
+    )
+    if fast_path:
+        caps = usend.Capability.NONE
+        for transport in transports:
+            caps |= get_transport_argspec(transport)[1]
+        configure_argparser_for_send(parser, caps)
+    else:
+        configure_argparser_for_transports(parser, transports,
+                                           defaults=not args.profile)
+
+    args = parser.parse_args(argv)
+    if args.help:
+        parser.print_help()
+        return 0
+
+    if args.ledger and not args.idempotency_key:
+        errmsg = "Error: --ledger requires --idempotency-key"
+        print(errmsg, file=sys.stderr)
+        return 1
+
+    # Params from command line
+    cmdline_params = {
+        k: v
+        for (k, v) in vars(args).items()
+        if k not in BASIC_ARGUMENTS and v
+    }
+    destinations = cmdline_params.pop('destination', None)
+
+    # Build each transport once and expand jobs for each destination
+    jobs = []
+    failures = 0
+    for (label, transport, params) in targets:
+        params = dict(params)
+        profile_destination = params.pop('destination', None)
+
+        # Only transports with a receiver get destinations
+        if get_transport_argspec(transport)[1] & usend.Capability.RECIEVER:
+            target_destinations = destinations or [profile_destination]
+        else:
+            target_destinations = [None]
+
+        try:
+            instance, init_params, send_params = build_transport(
+                transport, params, cmdline_params)
+        except (TypeError, ValueError, usend.ParameterError) as e:
+            print_error(label, transport, e)
+            failures += 1
+            continue
+
+        # Ledger scope, sends from different profiles or transport
+        # configurations never share idempotency keys
+        if args.idempotency_key:
+            send_params = dict(
+                send_params,
+                scope=label + ':' + usend.get_ledger_scope(**init_params))
+
+        for destination in target_destinations:
+            jobs.append(
+                (label, transport, instance, destination, send_params))
+
+    # Send
+    extra = {}
+    if args.idempotency_key:
+        extra['idempotency_key'] = args.idempotency_key
+        from usend import ledger as _ledger
+        extra['ledger'] = _ledger.Ledger(args.ledger)
+
+    results = dispatch(jobs, max_workers=args.jobs, **extra)
+    for ((label, transport, _, destination, _), e) in results:
+        if e is None:
+            continue
+
+        failures += 1
+        if destination is not None:
+            label = label + ' -> ' + str(destination)
+
+        print_error(label, transport, e)
+
+    return 1 if failures else 0
@@ -0,0 +1,268 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import zlib
+
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+def get_default_path():
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.expanduser('~/.cache')
+    return os.path.join(cache_dir, 'usend', 'ledger.jsonl')
+
+
+_default_ledger = None
+
+
+def get_default_ledger():
+    global _default_ledger
+
+    if _default_ledger is None:
+        _default_ledger = Ledger()
+
+    return _default_ledger
+
+
+class Ledger(object):
+    """
+    Local delivery ledger
+
+    Append-only JSON lines file mapping idempotency keys to send outcomes: a
+    status (PENDING while sending, SENT or FAILED) and a result (usually the
+    provider message id or an error description). An in-memory index is
+    loaded on open, lines appended by other processes are picked up when the
+    file changes.
+    The file is compacted when it grows over max_size: expired entries are
+    dropped and, if still too big, only the newest ones are kept.
+
+    Writes and compaction are serialized between processes with flock on
+    '<path>.lock' and per key locks use byte range locks on '<path>.keys'.
+    Inter-process locking is not available if fcntl is missing.
+    """
+
+    def __init__(self, path=None, retention=86400, max_size=1024 * 1024):
+        self.path = path or get_default_path()
+        self.retention = retention
+        self.max_size = max_size
+
+        self._index = {}
+        self._offset = 0
+        self._stat = None
+
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._keys_fh = None
+
+        with self._file_lock(exclusive=False):
+            self._refresh()
+
+    def _makedirs(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive=True):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+
+            self._makedirs()
+            with open(self.path + '.lock', 'a') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def _key_file_lock(self, key):
+        if fcntl is None:
+            yield
+            return
+
+        with self._lock:
+            if self._keys_fh is None:
+                # Keep it open: closing any descriptor of this file releases
+                # all the process' record locks on it
+                self._makedirs()
+                self._keys_fh = open(self.path + '.keys', 'a')
+            fh = self._keys_fh
+
+        offset = zlib.crc32(key.encode('utf-8'))
+        fcntl.lockf(fh, fcntl.LOCK_EX, 1, offset, os.SEEK_SET)
+        try:
+            yield
+        finally:
+            fcntl.lockf(fh, fcntl.LOCK_UN, 1, offset, os.SEEK_SET)
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Lock key against other threads and processes, use it around
+        get/send/record to avoid sending twice
+        """
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                with self._key_file_lock(key):
+                    yield
+
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _refresh(self):
+        """
+        Read lines appended since last refresh, reload everything if the file
+        has been replaced or truncated. Must be called with the file lock.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._index = {}
+            self._offset = 0
+            self._stat = None
+            return
+
+        stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat == self._stat:
+            return
+
+        if (self._stat is None or stat[0] != self._stat[0] or
+                st.st_size < self._offset):
+            self._index = {}
+            self._offset = 0
+
+        with open(self.path, 'rb') as fh:
+            fh.seek(self._offset)
+            data = fh.read()
+
+        # Leave incomplete trailing line for next refresh
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line.decode('utf-8'))
+                key, ts = entry['key'], entry['timestamp']
+            except (ValueError, KeyError, TypeError):
+                # Ignore truncated or garbage lines
+                continue
+
+            self._index[key] = (
+                ts, entry.get('status', SENT), entry.get('result'))
+
+        self._offset += end
+        self._stat = stat
+
+    def _is_expired(self, ts, now=None):
+        if now is None:
+            now = time.time()
+
+        return ts + self.retention < now
+
+    def get(self, key):
+        """
+        Get recorded (status, result) for key, raises KeyError if key is not
+        recorded or if it is out of the retention window.
+        """
+        with self._file_lock(exclusive=False):
+            self._refresh()
+            ts, status, result = self._index[key]
+
+        if self._is_expired(ts):
+            raise KeyError(key)
+
+        return status, result
+
+    def __contains__(self, key):
+        try:
+            self.get(key)
+        except KeyError:
+            return False
+
+        return True
+
+    def record(self, key, result=None, status=SENT):
+        entry = {
+            'key': key,
+            'timestamp': time.time(),
+            'status': status,
+            'result': result
+        }
+        line = json.dumps(entry, default=str) + '\n'
+
+        with self._file_lock():
+            self._makedirs()
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(line)
+                size = fh.tell()
+
+            self._refresh()
+
+            if size > self.max_size:
+                self._compact()
+
+    def compact(self):
+        with self._file_lock():
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        """
+        Must be called with the file lock and a refreshed index
+        """
+        now = time.time()
+        entries = sorted(
+            (
+                (ts, key, status, result)
+                for (key, (ts, status, result)) in self._index.items()
+                if not self._is_expired(ts, now)
+            ),
+            reverse=True
+        )
+
+        # Keep newest entries filling up to half of max_size so compaction
+        # doesn't run again on the next record
+        kept = []
+        lines = []
+        size = 0
+        for (ts, key, status, result) in entries:
+            line = json.dumps(
+                {'key': key, 'timestamp': ts, 'status': status,
+                 'result': result},
+                default=str) + '\n'
+            size += len(line.encode('utf-8'))
+            if size > self.max_size // 2:
+                break
+
+            kept.append((key, ts, status, result))
+            lines.append(line)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            fh.writelines(reversed(lines))
+        os.replace(tmp, self.path)
+
+        st = os.stat(self.path)
+        self._index = {
+            key: (ts, status, result)
+            for (key, ts, status, result) in kept
+        }
+        self._offset = st.st_size
+        self._stat = (st.st_ino, st.st_size, st.st_mtime_ns)
@@ -1,9 +1,82 @@
 import usend
 
 
+import itertools
+import json
+import random
+import threading
+import time
+
+
 class Transport(usend.Transport):
+    """
+    Null transport, sends nothing.
+
+    Latency, jitter (in seconds) and failure rate (0 to 1) can be simulated
+    and every send can be recorded as a JSON line in a file, useful as a
+    baseline for benchmarks.
+    """
+    PARAMETERS = (
+        usend.Parameter(
+            'latency',
+            default=0.0,
+            type=float),
+        usend.Parameter(
+            'jitter',
+            default=0.0,
+            type=float),
+        usend.Parameter(
+            'failure_rate',
+            default=0.0,
+            type=float),
+        usend.Parameter(
+            'record'),
+    )
     CAPS = usend.Capability.ALL
 
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 record=None):
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.failure_rate = float(failure_rate)
+        self.record = record
+
+        if self.latency < 0 or self.jitter < 0:
+            raise ValueError((latency, jitter), 'negative latency or jitter')
+
+        if not 0 <= self.failure_rate <= 1:
+            raise ValueError(failure_rate, 'invalid failure rate')
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
     def send(self, destination=None, message=None, details=None,
              attachments=None):
-        pass
+        """
+        Returns a sequential message id
+        """
+        delay = self.latency
+        if self.jitter:
+            delay = max(0, delay + random.uniform(-self.jitter, self.jitter))
+        if delay:
+            time.sleep(delay)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise usend.SendError('simulated failure')
+
+        message_id = next(self._ids)
+
+        if self.record:
+            line = json.dumps({
+                'id': message_id,
+                'timestamp': time.time(),
+                'destination': destination,
+                'message': message,
+                'details': details,
+                'attachments': attachments
+            }) + '\n'
+            with self._lock:
+                with open(self.record, 'a', encoding='utf-8') as fh:
+                    fh.write(line)
+
+        return message_id
@@ -69,6 +69,9 @@ class SMTP(usend.Transport):
             raise ValueError(port, 'invalid port')
 
     def send(self, destination, message=None, details=None, attachments=None):
+        """
+        Returns the Message-ID header of the sent email
+        """
         # check destination
         if not check_is_email(destination):
             raise ValueError(destination, 'not a valid email')
@@ -90,6 +93,8 @@ class SMTP(usend.Transport):
         msg['To'] = destination
         msg['Date'] = email.utils.formatdate(localtime=True)
         msg['Subject'] = message
+        msg['Message-ID'] = email.utils.make_msgid(
+            domain=self.sender.split('@')[-1])
         msg.attach(email.mime.text.MIMEText(message))
 
         for f in attachments or []:
@@ -105,3 +110,5 @@ class SMTP(usend.Transport):
         smtp = smtplib.SMTP(self.host, port=self.port)
         smtp.sendmail(self.sender, destination, msg.as_string())
         smtp.close()
+
+        return msg['Message-ID']
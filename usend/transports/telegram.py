@@ -50,6 +50,9 @@ class Transport(usend.Transport):
         return resp['result']
 
     def send(self, destination, message, details=None, attachments=None):
+        """
+        Returns the message_id of the last message sent
+        """
         try:
             destination = int(destination)
         except ValueError:
@@ -97,7 +100,7 @@ class Transport(usend.Transport):
             }
             url = self.BASE_API_URL + '/sendMessage'
             resp = requests.get(url, data=tg_data)
-            self.check_response(resp)
+            message_id = self.check_response(resp)['message_id']
             message = None
 
         tg_data = {
@@ -109,4 +112,6 @@ class Transport(usend.Transport):
             files = {'document': open(filepath, 'rb')}
             url = self.BASE_API_URL + '/sendDocument'
             resp = requests.post(url, data=tg_data, files=files)
-            self.check_response(resp)
+            message_id = self.check_response(resp)['message_id']
+
+        return message_id